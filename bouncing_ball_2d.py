@@ -4,6 +4,8 @@ import math
 import sys
 import pygame as pg
 from pygame import Vector2 as Vec
+from overlay import Overlay
+from timings import Profiler
 
 W = 800 # screen width
 H = 600 # screen height
@@ -115,13 +117,29 @@ def get_time() -> int:
 
 pg.init()
 pg.display.set_mode((W, H))
+profiler = Profiler()
+overlay = Overlay(profiler)
 
 while True:
-    for event in pg.event.get():
-        if event.type == pg.QUIT:
-            sys.exit()
-
-    screen().fill('black')
-    pos = get_pos(get_time())
-    pg.draw.circle(screen(), 'white', screen_pos(pos), R)
-    pg.display.flip()
\ No newline at end of file
+    with profiler.measure('events'):
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                sys.exit()
+
+            overlay.handle(event)
+
+    with profiler.measure('fill'):
+        screen().fill('black')
+
+    with profiler.measure('get_pos'):
+        pos = get_pos(get_time())
+
+    with profiler.measure('draw'):
+        pg.draw.circle(screen(), 'white', screen_pos(pos), R)
+
+    overlay.draw(screen())
+
+    with profiler.measure('flip'):
+        pg.display.flip()
+
+    profiler.end_frame()
\ No newline at end of file
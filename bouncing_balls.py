@@ -0,0 +1,109 @@
+"""
+A large population of balls, each following the model in bouncing_ball_2d.py
+with its own initial conditions, evaluated on worker threads by pipeline.py
+while the previous frame is drawn.
+
+Each ball is drawn as a single pixel at its bottom point. The window caption
+shows the frame rate and the average time per frame of each stage, and F3
+shows the overlay from overlay.py.
+"""
+
+import sys
+import numpy as np
+import pygame as pg
+import models
+import precision
+from overlay import Overlay
+from pipeline import Pipeline
+from timings import Profiler
+
+W = 800 # screen width
+H = 600 # screen height
+N = 100_000 # number of balls
+FPS = 60
+DEPTH = 2 # number of position buffers; 3 allows evaluation to take two frames
+SEED = 0
+FLOAT32 = True # store in float32 if that's accurate enough up to HORIZON
+HORIZON = 10 * 60 * 1000
+
+MODEL = models.BouncingBall2D
+rng = np.random.default_rng(SEED)
+bodies = models.population(MODEL, N)
+bodies['s0x'] = rng.uniform(0, W, N)
+bodies['s0y'] = rng.uniform(0, H / 2, N)
+bodies['u0x'] = rng.normal(0, 0.1, N)
+bodies['u0y'] = rng.normal(0, 0.2, N)
+bodies['g'] = 0.001
+bodies['k'] = rng.uniform(0.6, 0.95, N)
+bodies['floor'] = H - 1
+
+if FLOAT32:
+    bodies = precision.compact(MODEL, bodies, HORIZON)
+    print('storing bodies in', models.precision(bodies))
+
+def draw(surface: pg.Surface, pos: np.ndarray) -> int:
+    x = np.rint(pos[:, 0]).astype(np.intp) % W
+    y = np.rint(pos[:, 1]).astype(np.intp)
+    visible = (y >= 0) & (y < H)
+    pixels = pg.surfarray.pixels2d(surface)
+    pixels[x[visible], y[visible]] = surface.map_rgb(pg.Color('white'))
+    del pixels # unlocks the surface
+    return np.count_nonzero(visible)
+
+def screen() -> pg.Surface:
+    return pg.display.get_surface()
+
+initial_ticks = None
+
+def get_time() -> int:
+    global initial_ticks
+
+    if initial_ticks is None:
+        initial_ticks = pg.time.get_ticks()
+
+    return pg.time.get_ticks() - initial_ticks
+
+pg.init()
+pg.display.set_mode((W, H))
+clock = pg.time.Clock()
+profiler = Profiler()
+overlay = Overlay(profiler)
+pipeline = Pipeline(MODEL, bodies, depth=DEPTH, timings=profiler)
+period = 1000 / FPS
+
+# prime the pipeline so there is always a frame being evaluated while the
+# current one is drawn
+for i in range(DEPTH - 1):
+    pipeline.submit(get_time() + i * period)
+
+while True:
+    with profiler.measure('events'):
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                pipeline.close()
+                sys.exit()
+
+            overlay.handle(event)
+
+    t, pos = pipeline.swap()
+    pipeline.submit(get_time() + (DEPTH - 1) * period)
+
+    with profiler.measure('fill'):
+        screen().fill('black')
+
+    with profiler.measure('draw'):
+        profiler.count('bodies evaluated', len(pos))
+        profiler.count('bodies drawn', draw(screen(), pos))
+
+    overlay.draw(screen())
+
+    with profiler.measure('flip'):
+        pg.display.flip()
+
+    with profiler.measure('idle'):
+        clock.tick(FPS)
+
+    profiler.end_frame()
+
+    if profiler.frame % FPS == 0:
+        pg.display.set_caption(f'{clock.get_fps():.0f} fps {profiler.summary()}')
@@ -1,6 +1,8 @@
 import sys
 import pygame as pg
 from pygame import Vector2 as Vec
+from overlay import Overlay
+from timings import Profiler
 
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
@@ -30,14 +32,30 @@ def get_time() -> int:
 
 pg.init()
 pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+profiler = Profiler()
+overlay = Overlay(profiler)
 
 while True:
-    for event in pg.event.get():
-        if event.type == pg.QUIT:
-            sys.exit()
-
-    screen().fill('black')
-    pos = get_pos(get_time())
-    pg.draw.circle(screen(), 'white', screen_pos(pos), 50)
-    pg.display.flip()
+    with profiler.measure('events'):
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                sys.exit()
+
+            overlay.handle(event)
+
+    with profiler.measure('fill'):
+        screen().fill('black')
+
+    with profiler.measure('get_pos'):
+        pos = get_pos(get_time())
+
+    with profiler.measure('draw'):
+        pg.draw.circle(screen(), 'white', screen_pos(pos), 50)
+
+    overlay.draw(screen())
+
+    with profiler.measure('flip'):
+        pg.display.flip()
+
+    profiler.end_frame()
 
@@ -0,0 +1,119 @@
+"""
+Checks of where the energy goes in the models, computed from the closed-form
+velocities and energies in models.py for whole populations at once, rather
+than from finite differences of the positions.
+
+When a ball bounces, both components of its velocity are multiplied by K, so
+its kinetic energy, and hence its total energy (since it's on the ground),
+is multiplied by K^2: it loses a fraction 1 - K^2 of its energy on every
+bounce. bounce_losses() measures this. The energy is evaluated in the middle of
+each flight, where the velocity is smooth, rather than either side of the
+bounce itself, which would need a choice of how close to get to it. Between
+bounces the only force is gravity, so the energy at any point of a flight is
+the energy the ball has for all of it.
+
+Friction and drag don't have a potential, so the work they do is the energy
+lost by the body, which dissipated() measures. For constant friction this
+should be the magnitude of the friction times the distance travelled, which
+gives a check of the energies against the positions: friction_work() works
+that out for both of the models with friction.
+
+Running this file audits populations like those in the individual scripts.
+"""
+
+import time
+import numpy as np
+import models
+import precision
+
+def energy(model, bodies: np.ndarray, t) -> np.ndarray:
+    return model.kinetic(bodies, t) + model.potential(bodies, t)
+
+def bounce_losses(model, bodies: np.ndarray, bounces: int = 10) -> np.ndarray:
+    """
+    Returns a (bounces, n) array of the fraction of its energy each body loses
+    in each of its first `bounces` bounces. The fraction is NaN for bounces
+    that never happen.
+    """
+
+    n = np.arange(1, bounces + 2)[:, None]
+    starts = model.bounce_start(bodies, n)
+
+    # the middle of the flight before the first bounce and of each of the
+    # flights between bounces
+    middles = np.concatenate((starts[:1] / 2, (starts[:-1] + starts[1:]) / 2))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        energies = energy(model, bodies, middles)
+        losses = 1 - energies[1:] / energies[:-1]
+
+    return np.where(np.isfinite(middles[1:]), losses, np.nan)
+
+def dissipated(model, bodies: np.ndarray, t) -> np.ndarray:
+    """The energy each body has lost by time t."""
+
+    return energy(model, bodies, 0) - energy(model, bodies, t)
+
+def friction_work(model, bodies: np.ndarray, t) -> np.ndarray:
+    """
+    The work done by friction up to time t, as the magnitude of the friction
+    times the distance travelled, for ConstantFriction and
+    ConstantFrictionWithGravity.
+    """
+
+    s0 = model.pos(bodies, 0)
+    s = model.pos(bodies, t)
+
+    if model is models.ConstantFriction:
+        return bodies['friction'] * np.hypot(*np.moveaxis(s - s0, -1, 0))
+
+    # the direction of motion can change at the transition time
+    turn = model.pos(bodies, np.minimum(t, model.transition_time(bodies)))
+
+    return bodies['friction'] * (
+        np.abs(turn[..., 1] - s0[..., 1]) + np.abs(s[..., 1] - turn[..., 1])
+    )
+
+if __name__ == '__main__':
+    N = 1_000_000
+    HORIZON = 60_000
+
+    for model in (models.BouncingBall, models.BouncingBall2D):
+        bodies = precision.example(model, N)
+        start = time.perf_counter()
+        losses = bounce_losses(model, bodies)
+        elapsed = time.perf_counter() - start
+        expected = 1 - bodies['k'] ** 2
+        error = np.nanmax(np.abs(losses - expected))
+
+        print(
+            f'{model.__name__}: {np.count_nonzero(np.isfinite(losses))} bounces '
+            f'in {elapsed:.2f} s, largest difference from 1 - K^2 {error:.2g}'
+        )
+
+    for model in (models.ConstantFriction, models.ConstantFrictionWithGravity):
+        bodies = precision.example(model, N)
+        start = time.perf_counter()
+        work = dissipated(model, bodies, HORIZON)
+        elapsed = time.perf_counter() - start
+        expected = friction_work(model, bodies, HORIZON)
+        error = np.max(np.abs(work - expected) / np.maximum(expected, 1e-12))
+
+        print(
+            f'{model.__name__}: work {work.mean():.4g} on average in '
+            f'{elapsed:.2f} s, largest relative difference from friction '
+            f'times distance {error:.2g}'
+        )
+
+    for model in (models.LaminarDrag, models.TurbulentDrag):
+        bodies = precision.example(model, N)
+        start = time.perf_counter()
+        work = dissipated(model, bodies, HORIZON)
+        elapsed = time.perf_counter() - start
+        share = work / energy(model, bodies, 0)
+
+        print(
+            f'{model.__name__}: work {work.mean():.4g} on average in '
+            f'{elapsed:.2f} s, {np.median(share):.1%} of the initial energy '
+            'for the median body'
+        )
@@ -0,0 +1,795 @@
+"""
+Vectorised versions of the closed-form solutions in the individual simulation
+scripts, for evaluating the positions of many bodies at once.
+
+Each model is a class with no state of its own. Its FIELDS are the per-body
+parameters, and a population of bodies is a structured NumPy array with one
+field per parameter (see population()). The pos() method takes such an array
+and a time t (in milliseconds, as in the scripts) and returns an array of
+positions, with a final axis of length 2 for the x- and y-coordinates. t can
+be a scalar, giving an (n, 2) array, or an array broadcastable against the
+population: for example, with an (m, 1) array of times the result is an
+(m, n, 2) array of the positions of every body at every time. If out is given
+the positions are written into it instead, which lets callers evaluate slices
+of a population into slices of a preallocated buffer.
+
+vel() and acc() work in the same way, giving the velocity and acceleration
+from the derivatives of the closed-form solutions, and kinetic() and
+potential() give the kinetic and potential energy per unit mass. The
+potential energy is measured from the initial position, or from the ground
+for the bouncing balls, and is zero for the models where the only forces are
+friction or drag, which don't have a potential.
+
+Models whose velocity changes suddenly at certain times (such as when a ball
+bounces or an object stops) also have an events() method giving those times
+for the first body of a population, which plot.py uses to put the vertices of
+a trajectory's polyline in exactly the right places.
+
+A population can be stored in float32 rather than the default float64, which
+halves the memory it takes and the bandwidth needed to evaluate it; pos()
+then does its arithmetic in float32 too. See precision.py for the error this
+introduces and for choosing between the two.
+
+None of the work is done in Python loops, so NumPy releases the GIL for most of
+the time spent in pos(), and several threads can usefully evaluate different
+slices of the same population.
+"""
+
+import numpy as np
+
+def body_dtype(model, dtype=np.float64) -> np.dtype:
+    return np.dtype([(name, dtype) for name in model.FIELDS])
+
+def population(model, n: int, dtype=np.float64) -> np.ndarray:
+    return np.zeros(n, dtype=body_dtype(model, dtype))
+
+def precision(bodies: np.ndarray) -> np.dtype:
+    return bodies.dtype[0]
+
+def _time(bodies: np.ndarray, t):
+    # so that a float64 time doesn't promote a float32 population's arithmetic
+    return np.asarray(t, dtype=precision(bodies))
+
+def _within(times: np.ndarray, horizon: float) -> np.ndarray:
+    return times[(times > 0) & (times <= horizon)]
+
+def _shape(bodies: np.ndarray, t) -> tuple[int, ...]:
+    return np.broadcast_shapes(bodies.shape, np.shape(t))
+
+def _vectors(bodies: np.ndarray, t, out: np.ndarray | None) -> np.ndarray:
+    if out is None:
+        out = np.empty(_shape(bodies, t) + (2,), dtype=precision(bodies))
+
+    return out
+
+class Model:
+    """The methods which work the same way for every model."""
+
+    @classmethod
+    def kinetic(cls, bodies: np.ndarray, t) -> np.ndarray:
+        v = cls.vel(bodies, t)
+        return (v[..., 0] * v[..., 0] + v[..., 1] * v[..., 1]) / 2
+
+    @classmethod
+    def potential(cls, bodies: np.ndarray, t) -> np.ndarray:
+        return np.zeros(_shape(bodies, t), dtype=precision(bodies))
+
+class ConstantVelocity(Model):
+    """See constant_velocity.py."""
+
+    FIELDS = ('s0x', 's0y', 'ux', 'uy')
+
+    @staticmethod
+    def pos(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        out[..., 0] = bodies['s0x'] + t * bodies['ux']
+        out[..., 1] = bodies['s0y'] + t * bodies['uy']
+        return out
+
+    @staticmethod
+    def vel(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        out = _vectors(bodies, t, out)
+        out[..., 0] = bodies['ux']
+        out[..., 1] = bodies['uy']
+        return out
+
+    @staticmethod
+    def acc(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        out = _vectors(bodies, t, out)
+        out[...] = 0
+        return out
+
+class ConstantAcceleration(Model):
+    """See constant_acceleration.py."""
+
+    FIELDS = ('s0x', 's0y', 'ux', 'uy', 'ax', 'ay')
+
+    @staticmethod
+    def pos(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        out[..., 0] = bodies['s0x'] + t * (bodies['ux'] + (t / 2) * bodies['ax'])
+        out[..., 1] = bodies['s0y'] + t * (bodies['uy'] + (t / 2) * bodies['ay'])
+        return out
+
+    @staticmethod
+    def vel(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        out[..., 0] = bodies['ux'] + t * bodies['ax']
+        out[..., 1] = bodies['uy'] + t * bodies['ay']
+        return out
+
+    @staticmethod
+    def acc(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        out = _vectors(bodies, t, out)
+        out[..., 0] = bodies['ax']
+        out[..., 1] = bodies['ay']
+        return out
+
+    @classmethod
+    def potential(cls, bodies: np.ndarray, t) -> np.ndarray:
+        s = cls.pos(bodies, t)
+
+        return -(
+            bodies['ax'] * (s[..., 0] - bodies['s0x'])
+            + bodies['ay'] * (s[..., 1] - bodies['s0y'])
+        )
+
+class ConstantFriction(Model):
+    """
+    See constant_friction.py. Friction is the magnitude of the deceleration.
+    """
+
+    FIELDS = ('s0x', 's0y', 'ux', 'uy', 'friction')
+
+    @staticmethod
+    def stopping_time(bodies: np.ndarray) -> np.ndarray:
+        f = bodies['friction']
+
+        with np.errstate(divide='ignore'):
+            return np.where(
+                f > 0, np.hypot(bodies['ux'], bodies['uy']) / f, np.inf
+            )
+
+    @staticmethod
+    def stopping_distance(bodies: np.ndarray) -> np.ndarray:
+        """|u|^2/2a, or T/2 |u| in terms of the stopping time T."""
+
+        f = bodies['friction']
+        speed2 = bodies['ux'] * bodies['ux'] + bodies['uy'] * bodies['uy']
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(f > 0, speed2 / (2 * f), np.where(speed2 == 0, 0, np.inf))
+
+    @staticmethod
+    def events(bodies: np.ndarray, horizon: float, tolerance: float = 0.0) -> np.ndarray:
+        """The stopping time of bodies[0], if it's no later than horizon."""
+
+        return _within(ConstantFriction.stopping_time(bodies[:1]), horizon)
+
+    @staticmethod
+    def pos(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = np.minimum(_time(bodies, t), ConstantFriction.stopping_time(bodies))
+        out = _vectors(bodies, t, out)
+        speed = np.hypot(bodies['ux'], bodies['uy'])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # r + t(1 - at/2|u|) u, which at the stopping time is r + T/2 u
+            d = t * (1 - bodies['friction'] * t / (2 * speed))
+            d = np.where(speed == 0, 0, d)
+
+        out[..., 0] = bodies['s0x'] + d * bodies['ux']
+        out[..., 1] = bodies['s0y'] + d * bodies['uy']
+        return out
+
+    @staticmethod
+    def vel(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = np.minimum(_time(bodies, t), ConstantFriction.stopping_time(bodies))
+        out = _vectors(bodies, t, out)
+        speed = np.hypot(bodies['ux'], bodies['uy'])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # (1 - at/|u|) u, which is zero from the stopping time on
+            c = np.where(speed == 0, 0, 1 - bodies['friction'] * t / speed)
+
+        out[..., 0] = c * bodies['ux']
+        out[..., 1] = c * bodies['uy']
+        return out
+
+    @staticmethod
+    def acc(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        speed = np.hypot(bodies['ux'], bodies['uy'])
+        moving = t < ConstantFriction.stopping_time(bodies)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # -a/|u| u while moving
+            c = np.where(moving & (speed > 0), -bodies['friction'] / speed, 0)
+
+        out[..., 0] = c * bodies['ux']
+        out[..., 1] = c * bodies['uy']
+        return out
+
+class ConstantFrictionWithGravity(Model):
+    """
+    See constant_friction_with_gravity.py. The motion is along the y-axis, with
+    x constant, and friction is the magnitude of the friction.
+
+    This follows the derivation at the top of the script, which the script's
+    get_pos doesn't quite: it leaves out the factors of 1/2 in the
+    constant-acceleration terms, and after the transition time it measures the
+    time since the start rather than since the transition.
+    """
+
+    FIELDS = ('x', 's0', 'u', 'gravity', 'friction')
+
+    @staticmethod
+    def transition_time(bodies: np.ndarray) -> np.ndarray:
+        """
+        The time the velocity first reaches zero, which is infinite if it never
+        does and zero if it starts at zero.
+        """
+
+        u = bodies['u']
+        a0 = bodies['gravity'] - np.sign(u) * bodies['friction']
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tt = np.where(np.sign(u) == -np.sign(a0), -u / a0, np.inf)
+
+        return np.where(u == 0, 0, tt)
+
+    @staticmethod
+    def events(bodies: np.ndarray, horizon: float, tolerance: float = 0.0) -> np.ndarray:
+        """The transition time of bodies[0], if it's no later than horizon."""
+
+        return _within(
+            ConstantFrictionWithGravity.transition_time(bodies[:1]), horizon
+        )
+
+    @staticmethod
+    def pos(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        tt = ConstantFrictionWithGravity.transition_time(bodies)
+        a0, a1 = ConstantFrictionWithGravity._accelerations(bodies)
+        t0 = np.minimum(t, tt)
+        dt = np.maximum(t - tt, 0)
+        out[..., 0] = bodies['x']
+        out[..., 1] = (
+            bodies['s0'] + t0 * (bodies['u'] + a0 * t0 / 2) + a1 * dt * dt / 2
+        )
+        return out
+
+    @staticmethod
+    def _accelerations(bodies: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The accelerations before and after the transition time: the second
+        is zero if the friction is enough to hold the object in place.
+        """
+
+        g = bodies['gravity']
+        f = bodies['friction']
+        a0 = g - np.sign(bodies['u']) * f
+        a1 = np.where(f >= np.abs(g), 0, g - np.sign(g) * f)
+        return a0, a1
+
+    @staticmethod
+    def vel(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        tt = ConstantFrictionWithGravity.transition_time(bodies)
+        a0, a1 = ConstantFrictionWithGravity._accelerations(bodies)
+        out[..., 0] = 0
+
+        out[..., 1] = np.where(
+            t < tt, bodies['u'] + a0 * t, a1 * np.maximum(t - tt, 0)
+        )
+
+        return out
+
+    @staticmethod
+    def acc(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        tt = ConstantFrictionWithGravity.transition_time(bodies)
+        a0, a1 = ConstantFrictionWithGravity._accelerations(bodies)
+        out[..., 0] = 0
+        out[..., 1] = np.where(t < tt, a0, a1)
+        return out
+
+    @classmethod
+    def potential(cls, bodies: np.ndarray, t) -> np.ndarray:
+        s = cls.pos(bodies, t)[..., 1]
+        return -bodies['gravity'] * (s - bodies['s0'])
+
+class LaminarDrag(Model):
+    """See laminar_drag.py. Drag is the constant of proportionality k."""
+
+    FIELDS = ('s0x', 's0y', 'ux', 'uy', 'drag')
+
+    @staticmethod
+    def pos(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        k = bodies['drag']
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # (1 - e^(-kt))/k, which tends to t as k tends to 0
+            d = np.where(k == 0, t, -np.expm1(-k * t) / k)
+
+        out[..., 0] = bodies['s0x'] + d * bodies['ux']
+        out[..., 1] = bodies['s0y'] + d * bodies['uy']
+        return out
+
+    @staticmethod
+    def vel(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        c = np.exp(-bodies['drag'] * t)
+        out[..., 0] = c * bodies['ux']
+        out[..., 1] = c * bodies['uy']
+        return out
+
+    @staticmethod
+    def acc(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        k = bodies['drag']
+        c = -k * np.exp(-k * t)
+        out[..., 0] = c * bodies['ux']
+        out[..., 1] = c * bodies['uy']
+        return out
+
+class TurbulentDrag(Model):
+    """See turbulent_drag.py. Drag is the constant of proportionality k."""
+
+    FIELDS = ('s0x', 's0y', 'ux', 'uy', 'drag')
+
+    @staticmethod
+    def pos(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        x = bodies['drag'] * np.hypot(bodies['ux'], bodies['uy']) * t
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # the distance 1/k ln |k|u|t + 1| is along the unit vector u/|u|,
+            # so the displacement is t ln |x + 1|/x u with x = k|u|t, and
+            # ln |x + 1|/x tends to 1 as x tends to 0
+            d = t * np.where(
+                x == 0, 1,
+                np.where(x > -1, np.log1p(x), np.log(np.abs(1 + x))) / x
+            )
+
+        out[..., 0] = bodies['s0x'] + d * bodies['ux']
+        out[..., 1] = bodies['s0y'] + d * bodies['uy']
+        return out
+
+    @staticmethod
+    def vel(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+
+        # v = 1/(kt + 1/|u|) along u, i.e. u/(k|u|t + 1)
+        c = 1 / (bodies['drag'] * np.hypot(bodies['ux'], bodies['uy']) * t + 1)
+
+        out[..., 0] = c * bodies['ux']
+        out[..., 1] = c * bodies['uy']
+        return out
+
+    @staticmethod
+    def acc(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        k = bodies['drag']
+        speed = np.hypot(bodies['ux'], bodies['uy'])
+
+        # -k|v| v, i.e. -k|u| u/(k|u|t + 1)^2
+        c = -k * speed / (k * speed * t + 1) ** 2
+
+        out[..., 0] = c * bodies['ux']
+        out[..., 1] = c * bodies['uy']
+        return out
+
+def _bounce(s0y, u0y, g, k, floor, t):
+    """
+    The vertical motion shared by bouncing_ball.py and bouncing_ball_2d.py.
+
+    Returns (y, t1, u1y, n, kn, dt, d1, rest), where t1 is the time the first
+    bounce begins, u1y is the vertical velocity starting it, n is the index of
+    the bounce in progress at time t (1 for the first bounce, 0 before it),
+    kn = k^(n - 1), dt is the time since the start of the current bounce, d1
+    is the duration of the first bounce and rest says whether bouncing has
+    stopped (in which case n is infinite).
+
+    The time of the first bounce is the positive root of
+
+      s0y + u0y t + g t^2/2 = floor,
+
+    and I use the form of the quadratic formula that avoids cancellation for
+    each sign of u0y. This form also gives the right answer when g = 0.
+
+    The scripts only consider later bounces if the other root is non-positive,
+    which is always the case here as the ball has to start above the ground.
+    When g = 0 there are no later bounces; the ball just moves away from the
+    ground at constant speed.
+    """
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        d = floor - s0y
+        sqrt_delta = np.sqrt(u0y * u0y + 2 * g * d)
+
+        t1 = np.where(
+            u0y >= 0,
+            2 * d / (sqrt_delta + u0y),
+            (sqrt_delta - u0y) / g
+        )
+
+        t1 = np.where(d <= 0, 0, t1)
+        t1 = np.where(np.isnan(t1), np.inf, t1)
+
+        u1y = -k * (u0y + g * t1)
+        d1 = -2 * u1y / g
+        t_ = t - t1
+
+        # With K < 1, the bounce in progress at time t1 + t_ is the n for which
+        # the geometric series of bounce durations d1 (1 - K^n)/(1 - K) first
+        # exceeds t_, which gives the logarithm below. The series sums to
+        # d1/(1 - K), after which the ball is at rest.
+        n = np.where(
+            k == 1,
+            1 + np.floor(t_ / d1),
+            1 + np.floor(np.log1p(-t_ * (1 - k) / d1) / np.log(k))
+        )
+
+        rest = (g > 0) & (t_ >= 0) & (
+            (d1 == 0) | ((k < 1) & (t_ * (1 - k) >= d1))
+        )
+
+        n = np.where(t_ < 0, 0, np.where(g == 0, 1, n))
+        n = np.where(rest, np.inf, n)
+        kn = k ** np.maximum(n - 1, 0)
+
+        tau0 = d1 * np.where(k == 1, n - 1, (1 - kn) / (1 - k))
+        tau0 = np.where(n > 1, tau0, 0)
+        dt = t_ - tau0
+
+        y = np.where(
+            t_ < 0,
+            s0y + u0y * t + g * t * t / 2,
+            floor + kn * u1y * dt + g * dt * dt / 2
+        )
+
+        y = np.where(rest, floor, y)
+
+    return y, t1, u1y, n, kn, dt, d1, rest
+
+def _bounce_events(s0y, u0y, g, k, floor, horizon, tolerance) -> np.ndarray:
+    """
+    The times up to horizon at which each bounce starts, and the time bouncing
+    stops. Bounces which reach no higher than tolerance are left out, along
+    with all the (even lower) ones after them.
+    """
+
+    _, t1, _, _, _, _, d1, _ = _bounce(s0y, u0y, g, k, floor, 0)
+    t1, d1, g, k = float(t1[0]), float(d1[0]), float(g[0]), float(k[0])
+
+    if t1 > horizon:
+        return np.empty(0)
+
+    times = [t1]
+
+    if g > 0:
+        start = t1
+        duration = d1
+
+        # a bounce lasting d reaches a height of g d^2/8
+        while (
+            start + duration <= horizon
+            and start + duration > start
+            and g * duration * duration / 8 > tolerance
+        ):
+            start += duration
+            times.append(start)
+            duration *= k
+
+        if k < 1 and t1 + d1 / (1 - k) <= horizon:
+            times.append(t1 + d1 / (1 - k))
+
+    return np.array(times)
+
+def _bounce_stop(s0y, u0y, g, k, floor) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns (T, t1, d1): the time bouncing stops, which is infinite if it
+    never does, along with the time of the first bounce and its duration.
+    """
+
+    _, t1, _, _, _, _, d1, _ = _bounce(s0y, u0y, g, k, floor, 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        T = np.where(
+            (g > 0) & ((k < 1) | (d1 == 0)),
+            t1 + np.where(d1 == 0, 0, d1 / (1 - k)),
+            np.inf
+        )
+
+    return T, t1, d1
+
+def _bounce_vel(s0y, u0y, g, k, floor, t) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The vertical velocity and acceleration of a bouncing ball: the
+    derivatives of y from _bounce().
+    """
+
+    _, t1, u1y, _, kn, dt, _, rest = _bounce(s0y, u0y, g, k, floor, t)
+
+    with np.errstate(invalid='ignore'):
+        vy = np.where(
+            t < t1, u0y + g * t, np.where(rest, 0, kn * u1y + g * dt)
+        )
+
+    return vy, np.where(rest, 0, g)
+
+def _bounce_start(s0y, u0y, g, k, floor, n) -> np.ndarray:
+    """The time bounce n starts, for n >= 1."""
+
+    _, t1, _, _, _, _, d1, _ = _bounce(s0y, u0y, g, k, floor, 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # d1 times the geometric series of the durations of the earlier
+        # bounces, which is zero if the first bounce takes no time
+        series = np.where(k == 1, n - 1, (1 - k ** (n - 1)) / (1 - k))
+        return t1 + np.where((n > 1) & (d1 != 0), d1 * series, 0)
+
+class BouncingBall(Model):
+    """
+    See bouncing_ball.py. The position is that of the ball's bottom point, x is
+    its constant horizontal position and floor is the y-coordinate of the
+    ground.
+    """
+
+    FIELDS = ('x', 's0', 'u0', 'g', 'k', 'floor')
+
+    @staticmethod
+    def pos(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        out[..., 0] = bodies['x']
+
+        out[..., 1] = _bounce(
+            bodies['s0'], bodies['u0'], bodies['g'], bodies['k'],
+            bodies['floor'], t
+        )[0]
+
+        return out
+
+    @staticmethod
+    def vel(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        out[..., 0] = 0
+
+        out[..., 1] = _bounce_vel(
+            bodies['s0'], bodies['u0'], bodies['g'], bodies['k'],
+            bodies['floor'], t
+        )[0]
+
+        return out
+
+    @staticmethod
+    def acc(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        out[..., 0] = 0
+
+        out[..., 1] = _bounce_vel(
+            bodies['s0'], bodies['u0'], bodies['g'], bodies['k'],
+            bodies['floor'], t
+        )[1]
+
+        return out
+
+    @classmethod
+    def potential(cls, bodies: np.ndarray, t) -> np.ndarray:
+        # the y-axis points down, so the height is floor - y
+        return bodies['g'] * (bodies['floor'] - cls.pos(bodies, t)[..., 1])
+
+    @staticmethod
+    def bounce_index(bodies: np.ndarray, t) -> np.ndarray:
+        """
+        The index of the bounce in progress at time t: 0 before the first
+        bounce and infinite once bouncing has stopped.
+        """
+
+        return _bounce(
+            bodies['s0'], bodies['u0'], bodies['g'], bodies['k'],
+            bodies['floor'], _time(bodies, t)
+        )[3]
+
+    @staticmethod
+    def stopping_time(bodies: np.ndarray) -> np.ndarray:
+        """The time bouncing stops, which is infinite if it never does."""
+
+        return _bounce_stop(
+            bodies['s0'], bodies['u0'], bodies['g'], bodies['k'],
+            bodies['floor']
+        )[0]
+
+    @staticmethod
+    def bounce_start(bodies: np.ndarray, n) -> np.ndarray:
+        """
+        The time bounce n (counting from 1) of each body starts, which is
+        infinite if there is no such bounce. n may be an array broadcastable
+        against the population.
+        """
+
+        return _bounce_start(
+            bodies['s0'], bodies['u0'], bodies['g'], bodies['k'],
+            bodies['floor'], n
+        )
+
+    @staticmethod
+    def events(bodies: np.ndarray, horizon: float, tolerance: float = 0.0) -> np.ndarray:
+        """
+        The times up to horizon at which each bounce of bodies[0] starts, and
+        the time its bouncing stops. Bounces no higher than tolerance are left
+        out.
+        """
+
+        b = bodies[:1]
+
+        return _bounce_events(
+            b['s0'], b['u0'], b['g'], b['k'], b['floor'], horizon, tolerance
+        )
+
+class BouncingBall2D(Model):
+    """
+    See bouncing_ball_2d.py. The position is that of the ball's bottom point
+    and floor is the y-coordinate of the ground.
+
+    The script finds the x-position at the start of the nth bounce by scaling
+    the horizontal distance covered in the first bounce by the same geometric
+    series as the start time. But the distance covered in a bounce is the
+    product of its duration and its horizontal velocity, both of which are
+    scaled by K on each bounce, so the ratio of the series should be K^2 rather
+    than K. That is what makes the later bounces jump horizontally in the
+    script; here the correct ratio is used.
+    """
+
+    FIELDS = ('s0x', 's0y', 'u0x', 'u0y', 'g', 'k', 'floor')
+
+    @staticmethod
+    def pos(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        s0x = bodies['s0x']
+        u0x = bodies['u0x']
+        k = bodies['k']
+
+        y, t1, u1y, n, kn, dt, d1, rest = _bounce(
+            bodies['s0y'], bodies['u0y'], bodies['g'], k, bodies['floor'], t
+        )
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            s1x = s0x + u0x * t1
+            u1x = k * u0x
+            k2 = k * k
+
+            # horizontal distance covered by the bounces before the nth
+            sx0 = s1x + u1x * d1 * np.where(
+                k2 == 1, n - 1, (1 - kn * kn) / (1 - k2)
+            )
+
+            sx0 = np.where(n > 1, sx0, s1x)
+
+            # x-position when bouncing stops
+            st = s1x + np.where(d1 == 0, 0, u1x * d1 / (1 - k2))
+
+            out[..., 0] = np.where(
+                t < t1,
+                s0x + u0x * t,
+                np.where(rest, st, sx0 + kn * u1x * dt)
+            )
+
+        out[..., 1] = y
+        return out
+
+    @staticmethod
+    def vel(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        u0x = bodies['u0x']
+        k = bodies['k']
+
+        _, t1, _, _, kn, _, _, rest = _bounce(
+            bodies['s0y'], bodies['u0y'], bodies['g'], k, bodies['floor'], t
+        )
+
+        out[..., 0] = np.where(t < t1, u0x, np.where(rest, 0, kn * k * u0x))
+
+        out[..., 1] = _bounce_vel(
+            bodies['s0y'], bodies['u0y'], bodies['g'], k, bodies['floor'], t
+        )[0]
+
+        return out
+
+    @staticmethod
+    def acc(bodies: np.ndarray, t, out: np.ndarray | None = None) -> np.ndarray:
+        t = _time(bodies, t)
+        out = _vectors(bodies, t, out)
+        out[..., 0] = 0
+
+        out[..., 1] = _bounce_vel(
+            bodies['s0y'], bodies['u0y'], bodies['g'], bodies['k'],
+            bodies['floor'], t
+        )[1]
+
+        return out
+
+    @classmethod
+    def potential(cls, bodies: np.ndarray, t) -> np.ndarray:
+        return bodies['g'] * (bodies['floor'] - cls.pos(bodies, t)[..., 1])
+
+    @staticmethod
+    def bounce_index(bodies: np.ndarray, t) -> np.ndarray:
+        """See BouncingBall.bounce_index."""
+
+        return _bounce(
+            bodies['s0y'], bodies['u0y'], bodies['g'], bodies['k'],
+            bodies['floor'], _time(bodies, t)
+        )[3]
+
+    @staticmethod
+    def stopping_time(bodies: np.ndarray) -> np.ndarray:
+        """See BouncingBall.stopping_time."""
+
+        return _bounce_stop(
+            bodies['s0y'], bodies['u0y'], bodies['g'], bodies['k'],
+            bodies['floor']
+        )[0]
+
+    @staticmethod
+    def rest_pos(bodies: np.ndarray) -> np.ndarray:
+        """
+        The position the ball comes to rest at (ST in the script), which is
+        NaN if it never does.
+        """
+
+        T, t1, d1 = _bounce_stop(
+            bodies['s0y'], bodies['u0y'], bodies['g'], bodies['k'],
+            bodies['floor']
+        )
+
+        k = bodies['k']
+        u1x = k * bodies['u0x']
+        out = np.empty(bodies.shape + (2,), dtype=precision(bodies))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            st = bodies['s0x'] + bodies['u0x'] * t1 + np.where(
+                d1 == 0, 0, u1x * d1 / (1 - k * k)
+            )
+
+        out[..., 0] = np.where(np.isfinite(T), st, np.nan)
+        out[..., 1] = np.where(np.isfinite(T), bodies['floor'], np.nan)
+        return out
+
+    @staticmethod
+    def bounce_start(bodies: np.ndarray, n) -> np.ndarray:
+        """See BouncingBall.bounce_start."""
+
+        return _bounce_start(
+            bodies['s0y'], bodies['u0y'], bodies['g'], bodies['k'],
+            bodies['floor'], n
+        )
+
+    @staticmethod
+    def events(bodies: np.ndarray, horizon: float, tolerance: float = 0.0) -> np.ndarray:
+        """See BouncingBall.events."""
+
+        b = bodies[:1]
+
+        return _bounce_events(
+            b['s0y'], b['u0y'], b['g'], b['k'], b['floor'], horizon, tolerance
+        )
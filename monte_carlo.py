@@ -0,0 +1,457 @@
+"""
+Monte Carlo propagation of uncertainty in the parameters of a model to
+quantities computed from it, such as where and when a bouncing ball comes to
+rest, or how far a body slides against friction.
+
+run() draws the parameters of a population of bodies from given distributions
+in chunks, evaluates each quantity for a whole chunk at once with the
+closed-form methods in models.py, and folds the results into running
+statistics before drawing the next chunk, so the memory used depends on the
+chunk size but not on the number of samples. Each quantity gets a Summary of:
+
+- its mean and variance, kept with Welford's method. Each chunk's mean and sum
+  of squared deviations are computed directly and then combined with the
+  running ones using the pairwise update of Chan, Golub and LeVeque, which is
+  Welford's update for a batch of samples rather than a single one.
+
+- a quantile sketch, which puts each sample in a bucket whose bounds grow
+  geometrically (as in DDSketch), so every quantile is found to within a given
+  relative error however widely the values are spread, in a fixed number of
+  buckets.
+
+- optionally, a histogram with fixed bins.
+
+Quantities can give one value per body or, for time series, a row of values
+per body, in which case every statistic is kept for each column. Values that
+aren't finite, such as the stopping time of a ball that never stops, are
+counted but left out of the statistics.
+
+All three kinds of statistics can be merged, so chunks are shared out between
+processes and their summaries merged as they come back. The random numbers for
+chunk i come from a generator seeded with the seed and i, so the results
+depend only on the seed and chunk size, not on the number of processes or the
+order chunks finish in; summaries are merged in the order of their chunks so
+that rounding is the same too.
+
+Running this file propagates the uncertainty in the examples from
+bouncing_ball_2d.py and constant_friction.py.
+"""
+
+import math
+import multiprocessing as mp
+import time
+import numpy as np
+import models
+
+class Normal:
+    def __init__(self, mean: float, sd: float):
+        self.mean = mean
+        self.sd = sd
+
+    def __call__(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return rng.normal(self.mean, self.sd, n)
+
+class Uniform:
+    def __init__(self, low: float, high: float):
+        self.low = low
+        self.high = high
+
+    def __call__(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return rng.uniform(self.low, self.high, n)
+
+def _columns(x: np.ndarray) -> np.ndarray:
+    return x.reshape(len(x), -1)
+
+class Welford:
+    """Running count, mean and variance of each column."""
+
+    def __init__(self, columns: int = 1):
+        self.count = np.zeros(columns, dtype=np.int64)
+        self.mean = np.zeros(columns)
+        self.m2 = np.zeros(columns) # sum of squared deviations from the mean
+
+    def update(self, x: np.ndarray) -> None:
+        x = _columns(x)
+        finite = np.isfinite(x)
+        count = finite.sum(axis=0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(finite, x, 0).sum(axis=0) / count
+
+        m2 = (np.where(finite, x - mean, 0) ** 2).sum(axis=0)
+        self._combine(count, np.nan_to_num(mean), m2)
+
+    def merge(self, other: 'Welford') -> None:
+        self._combine(other.count, other.mean, other.m2)
+
+    def _combine(self, count: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> None:
+        total = self.count + count
+        delta = mean - self.mean
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            share = np.where(total > 0, count / total, 0)
+
+        self.mean = self.mean + delta * share
+        self.m2 = self.m2 + m2 + delta * delta * self.count * share
+        self.count = total
+
+    @property
+    def variance(self) -> np.ndarray:
+        """The sample variance, which is NaN for fewer than two samples."""
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    @property
+    def sd(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+class QuantileSketch:
+    """
+    Counts of the values in each column in buckets (gamma^(i-1), gamma^i] of
+    their magnitude, separately for positive and negative values, where gamma
+    = (1 + accuracy) / (1 - accuracy). Any value in a bucket is within a
+    relative error of `accuracy` of the bucket's representative value, so
+    quantiles are too. Magnitudes below `smallest` are counted as zero, and
+    the buckets cover magnitudes up to about smallest * gamma^buckets, beyond
+    which values are put in the last bucket.
+    """
+
+    def __init__(
+        self,
+        columns: int = 1,
+        accuracy: float = 0.005,
+        smallest: float = 1e-9,
+        buckets: int = 8192
+    ):
+        self.accuracy = accuracy
+        self.smallest = smallest
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.positive = np.zeros((columns, buckets), dtype=np.int64)
+        self.negative = np.zeros((columns, buckets), dtype=np.int64)
+        self.zero = np.zeros(columns, dtype=np.int64)
+
+    def _counts(self, magnitudes: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        columns_, buckets = self.positive.shape
+        index = np.ceil(np.log(magnitudes / self.smallest) / math.log(self.gamma))
+        index = np.clip(index, 0, buckets - 1).astype(np.intp)
+
+        return np.bincount(
+            columns * buckets + index, minlength=columns_ * buckets
+        ).reshape(columns_, buckets)
+
+    def update(self, x: np.ndarray) -> None:
+        x = _columns(x)
+        columns = np.broadcast_to(np.arange(x.shape[1]), x.shape)
+        finite = np.isfinite(x)
+        large = finite & (np.abs(x) >= self.smallest)
+        positive = large & (x > 0)
+        negative = large & (x < 0)
+
+        self.positive += self._counts(x[positive], columns[positive])
+        self.negative += self._counts(-x[negative], columns[negative])
+        self.zero += (finite & ~large).sum(axis=0)
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        self.positive += other.positive
+        self.negative += other.negative
+        self.zero += other.zero
+
+    def quantile(self, q) -> np.ndarray:
+        """
+        Returns the q-quantile of each column, or, if q is an array, a row of
+        quantiles for each of its elements. The quantile is NaN for columns
+        with no finite values.
+        """
+
+        buckets = self.positive.shape[1]
+        bounds = self.smallest * self.gamma ** np.arange(buckets)
+        values = 2 * bounds / (self.gamma + 1)
+
+        # every bucket in increasing order of value
+        values = np.concatenate((-values[::-1], [0.0], values))
+        counts = np.concatenate(
+            (self.negative[:, ::-1], self.zero[:, None], self.positive), axis=1
+        )
+
+        cumulative = np.cumsum(counts, axis=1)
+        total = cumulative[:, -1:]
+        q = np.asarray(q, dtype=float)
+        rank = np.floor(q.reshape(1, -1) * np.maximum(total - 1, 0))
+
+        out = np.array([
+            values[np.searchsorted(row, column_rank, side='right')]
+            if row[-1] else np.full(column_rank.shape, np.nan)
+            for row, column_rank in zip(cumulative, rank)
+        ])
+
+        return out.reshape(out.shape[:1] + q.shape)
+
+class Histogram:
+    """
+    Counts of the values in each column in `bins` equal bins between low and
+    high, along with the number below low and at or above high.
+    """
+
+    def __init__(self, low: float, high: float, bins: int, columns: int = 1):
+        self.low = low
+        self.high = high
+        self.counts = np.zeros((columns, bins), dtype=np.int64)
+        self.below = np.zeros(columns, dtype=np.int64)
+        self.above = np.zeros(columns, dtype=np.int64)
+
+    @property
+    def edges(self) -> np.ndarray:
+        return np.linspace(self.low, self.high, self.counts.shape[1] + 1)
+
+    def update(self, x: np.ndarray) -> None:
+        x = _columns(x)
+        columns_, bins = self.counts.shape
+        columns = np.broadcast_to(np.arange(x.shape[1]), x.shape)
+        finite = np.isfinite(x)
+        below = finite & (x < self.low)
+        above = finite & (x >= self.high)
+        inside = finite & ~below & ~above
+
+        index = ((x[inside] - self.low) * (bins / (self.high - self.low)))
+        index = np.minimum(index.astype(np.intp), bins - 1)
+
+        self.counts += np.bincount(
+            columns[inside] * bins + index, minlength=columns_ * bins
+        ).reshape(columns_, bins)
+
+        self.below += below.sum(axis=0)
+        self.above += above.sum(axis=0)
+
+    def merge(self, other: 'Histogram') -> None:
+        self.counts += other.counts
+        self.below += other.below
+        self.above += other.above
+
+class Summary:
+    """The streaming statistics of one quantity."""
+
+    def __init__(self, columns: int = 1, histogram: tuple | None = None):
+        self.moments = Welford(columns)
+        self.sketch = QuantileSketch(columns)
+        self.histogram = None if histogram is None else Histogram(*histogram, columns)
+        self.nonfinite = np.zeros(columns, dtype=np.int64)
+
+    def update(self, x: np.ndarray) -> None:
+        self.moments.update(x)
+        self.sketch.update(x)
+
+        if self.histogram is not None:
+            self.histogram.update(x)
+
+        self.nonfinite += (~np.isfinite(_columns(x))).sum(axis=0)
+
+    def merge(self, other: 'Summary') -> None:
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+
+        if self.histogram is not None:
+            self.histogram.merge(other.histogram)
+
+        self.nonfinite += other.nonfinite
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self.moments.mean
+
+    @property
+    def sd(self) -> np.ndarray:
+        return self.moments.sd
+
+    def quantile(self, q) -> np.ndarray:
+        return self.sketch.quantile(q)
+
+def sample(model, parameters: dict, n: int, rng: np.random.Generator, dtype=np.float64) -> np.ndarray:
+    """
+    Returns a population of n bodies whose parameters are drawn from
+    parameters, which maps field names to distributions (called with rng and
+    n) or constants. Fields that aren't given are 0. The fields are drawn in
+    the order of model.FIELDS, so the same rng gives the same population.
+    """
+
+    bodies = models.population(model, n, dtype)
+
+    for field in model.FIELDS:
+        value = parameters.get(field, 0)
+        bodies[field] = value(rng, n) if callable(value) else value
+
+    return bodies
+
+# the arguments of run(), set in each worker process by _initialise() so they
+# only have to be sent once, rather than with each chunk
+_job = None
+
+def _initialise(job) -> None:
+    global _job
+    _job = job
+
+def _chunk(i: int) -> dict[str, Summary]:
+    model, parameters, quantities, samples, chunk_size, seed, histograms, dtype = _job
+    n = min(chunk_size, samples - i * chunk_size)
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(i,)))
+    bodies = sample(model, parameters, n, rng, dtype)
+    summaries = {}
+
+    for name, quantity in quantities.items():
+        with np.errstate(all='ignore'):
+            x = quantity(bodies)
+
+        summaries[name] = Summary(_columns(x).shape[1], histograms.get(name))
+        summaries[name].update(x)
+
+    return summaries
+
+def run(
+    model,
+    parameters: dict,
+    quantities: dict,
+    samples: int,
+    chunk_size: int = 1 << 18,
+    seed: int = 0,
+    processes: int | None = None,
+    histograms: dict | None = None,
+    dtype=np.float64
+) -> dict[str, Summary]:
+    """
+    Returns a Summary for each of quantities, which maps names to functions
+    taking a population of bodies of the model and returning either one value
+    per body or a row of values per body, evaluated over `samples` bodies with
+    parameters drawn as by sample(). histograms maps names of quantities to
+    the (low, high, bins) of a histogram to keep for them.
+
+    The chunks are shared out between `processes` processes, or all the
+    available ones if it's None; with 1 they're evaluated in this process.
+    Where processes are started by spawning rather than forking, the
+    distributions and quantities have to be picklable, so defined at the top
+    level of a module rather than lambdas.
+
+    Raises ValueError if samples or chunk_size is less than 1.
+    """
+
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+
+    if samples < 1:
+        raise ValueError('need at least one sample')
+
+    job = (
+        model, parameters, quantities, samples, chunk_size, seed,
+        histograms or {}, dtype
+    )
+
+    chunks = range(-(-samples // chunk_size))
+    summaries = None
+
+    if processes == 1:
+        _initialise(job)
+        results = map(_chunk, chunks)
+        pool = None
+    else:
+        pool = mp.Pool(processes, _initialise, (job,))
+        results = pool.imap(_chunk, chunks)
+
+    try:
+        for chunk in results:
+            if summaries is None:
+                summaries = chunk
+            else:
+                for name, summary in chunk.items():
+                    summaries[name].merge(summary)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return summaries
+
+# Quantities for the examples below, at the top level so they can be pickled
+
+def stopping_time(bodies: np.ndarray) -> np.ndarray:
+    return models.BouncingBall2D.stopping_time(bodies)
+
+def rest_x(bodies: np.ndarray) -> np.ndarray:
+    return models.BouncingBall2D.rest_pos(bodies)[:, 0]
+
+HEIGHT_TIMES = np.arange(1, 11) * 1000.0
+
+def height(bodies: np.ndarray) -> np.ndarray:
+    """The height above the floor at each of HEIGHT_TIMES."""
+
+    y = models.BouncingBall2D.pos(bodies, HEIGHT_TIMES[:, None])[..., 1]
+    return (bodies['floor'] - y).T
+
+def stopping_distance(bodies: np.ndarray) -> np.ndarray:
+    return models.ConstantFriction.stopping_distance(bodies)
+
+if __name__ == '__main__':
+    SAMPLES = 10_000_000
+    QUANTILES = [0.05, 0.5, 0.95]
+
+    def report(name: str, summary: Summary, unit: str, scale: float = 1.0) -> None:
+        q = summary.quantile(QUANTILES)[0] * scale
+
+        print(
+            f'  {name}: mean {summary.mean[0] * scale:.6g} {unit}, '
+            f'sd {summary.sd[0] * scale:.4g}, 5/50/95% '
+            f'{q[0]:.5g} / {q[1]:.5g} / {q[2]:.5g}, '
+            f'{summary.nonfinite[0]} never'
+        )
+
+    # as in bouncing_ball_2d.py, with uncertain launch velocity and restitution
+    ball = {
+        's0x': 0, 's0y': 100,
+        'u0x': Normal(0.1, 0.01), 'u0y': Normal(0.2, 0.02),
+        'g': 0.001, 'k': Uniform(0.75, 0.85), 'floor': 600
+    }
+
+    # as in constant_friction.py, with uncertain friction
+    sliding = {
+        's0x': 0, 's0y': 0, 'ux': 0.8, 'uy': 0.6,
+        'friction': Normal(0.00075, 0.00005)
+    }
+
+    for processes in (1, None):
+        start = time.perf_counter()
+
+        summaries = run(
+            models.BouncingBall2D, ball,
+            {'T': stopping_time, 'ST': rest_x, 'height': height},
+            SAMPLES, processes=processes, histograms={'T': (0, 60_000, 60)}
+        )
+
+        elapsed = time.perf_counter() - start
+        label = 'all processes' if processes is None else '1 process'
+        print(f'BouncingBall2D, {SAMPLES} samples in {elapsed:.2f} s with {label}')
+        report('T', summaries['T'], 's', 1e-3)
+        report('ST', summaries['ST'], 'px')
+
+    heights = summaries['height']
+    print('  height above the floor at 1..10 s, mean (sd):')
+
+    print('   ', ' '.join(
+        f'{mean:.1f} ({sd:.1f})' for mean, sd in zip(heights.mean, heights.sd)
+    ))
+
+    histogram = summaries['T'].histogram
+    mode = np.argmax(histogram.counts[0])
+    edges = histogram.edges
+
+    print(
+        f'  most common T between {edges[mode] / 1000:g} and '
+        f'{edges[mode + 1] / 1000:g} s ({histogram.counts[0, mode]} samples)'
+    )
+
+    start = time.perf_counter()
+
+    summaries = run(
+        models.ConstantFriction, sliding, {'distance': stopping_distance}, SAMPLES
+    )
+
+    elapsed = time.perf_counter() - start
+    print(f'ConstantFriction, {SAMPLES} samples in {elapsed:.2f} s')
+    report('stopping distance', summaries['distance'], 'px')
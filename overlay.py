@@ -0,0 +1,146 @@
+"""
+An optional in-window overlay showing where the time in a render loop goes,
+using the statistics kept by a timings.Profiler.
+
+The overlay shows the frame rate, the median and 99th percentile frame times,
+a histogram of frame times, the mean time per frame of each stage (and how
+much of the frame that is), and the most recent counts, such as the number of
+bodies evaluated and drawn. Background figures, like the time worker threads
+spend evaluating, aren't part of the frame, so they're shown on a line of
+their own without a share. It's hidden to begin with; F3 toggles it, and F4
+writes the profiler's rolling window of frame timings to a CSV file, whether
+or not the overlay is showing.
+
+Rendering text is slow compared to the rest of a frame in the simpler scripts,
+so the overlay is only re-rendered every `refresh` seconds, and in between the
+cached surface is just blitted onto the screen.
+"""
+
+import time
+import pygame as pg
+from timings import Profiler
+
+BIN_MS = 2 # width of each bar of the histogram
+BINS = 20 # the last bar counts every frame longer than BIN_MS * (BINS - 1)
+BAR_WIDTH = 8
+HISTOGRAM_HEIGHT = 40
+STAGE_BAR_WIDTH = 100
+MARGIN = 6
+
+class Overlay:
+    def __init__(
+        self,
+        profiler: Profiler,
+        toggle_key: int = pg.K_F3,
+        dump_key: int = pg.K_F4,
+        dump_path: str = 'frame_times.csv',
+        refresh: float = 0.25
+    ):
+        self.profiler = profiler
+        self.toggle_key = toggle_key
+        self.dump_key = dump_key
+        self.dump_path = dump_path
+        self.refresh = refresh
+        self.visible = False
+        self.font = pg.font.Font(None, 18)
+        self.surface = None
+        self.rendered_at = 0.0
+
+    def handle(self, event: pg.event.Event) -> None:
+        if event.type != pg.KEYDOWN:
+            return
+
+        if event.key == self.toggle_key:
+            self.visible = not self.visible
+            self.surface = None
+        elif event.key == self.dump_key:
+            self.profiler.dump(self.dump_path)
+            print('frame timings written to', self.dump_path)
+
+    def draw(self, surface: pg.Surface) -> None:
+        if not self.visible:
+            return
+
+        with self.profiler.measure('overlay'):
+            now = time.perf_counter()
+
+            if self.surface is None or now - self.rendered_at >= self.refresh:
+                self.surface = self._render()
+                self.rendered_at = now
+
+            surface.blit(self.surface, (0, 0))
+
+    def _lines(self) -> list[str]:
+        profiler = self.profiler
+        median = 1000 * profiler.percentile(0.5)
+        p99 = 1000 * profiler.percentile(0.99)
+        counts = [f'{name}: {value}' for name, value in profiler.counts.items()]
+        return [f'{profiler.fps():.1f} fps  {median:.1f} ms median  {p99:.1f} ms p99', *counts]
+
+    def _render(self) -> pg.Surface:
+        profiler = self.profiler
+        frame = sum(profiler.frame_times()) / max(len(profiler.frames), 1)
+        lines = self._lines()
+        line_height = self.font.get_linesize()
+        stages = list(profiler.samples)
+
+        background = 'background: ' + '  '.join(
+            f'{name} {1000 * profiler.mean(name):.2f} ms'
+            for name in profiler.background
+        ) if profiler.background else ''
+
+        width = MARGIN * 2 + max(
+            BINS * BAR_WIDTH, 250, self.font.size(background)[0]
+        )
+
+        height = (
+            MARGIN * 3 + HISTOGRAM_HEIGHT
+            + line_height * (len(lines) + len(stages) + bool(background))
+        )
+
+        result = pg.Surface((width, height), pg.SRCALPHA)
+        result.fill((0, 0, 0, 180))
+        y = MARGIN
+
+        for line in lines:
+            result.blit(self.font.render(line, True, 'white'), (MARGIN, y))
+            y += line_height
+
+        counts = [0] * BINS
+
+        for seconds in profiler.frame_times():
+            counts[min(int(1000 * seconds / BIN_MS), BINS - 1)] += 1
+
+        most = max(counts) or 1
+        y += MARGIN
+
+        for i, count in enumerate(counts):
+            bar = HISTOGRAM_HEIGHT * count // most
+            colour = 'green' if (i + 1) * BIN_MS <= 1000 / 60 else 'orange'
+
+            pg.draw.rect(result, colour, (
+                MARGIN + i * BAR_WIDTH, y + HISTOGRAM_HEIGHT - bar,
+                BAR_WIDTH - 1, bar
+            ))
+
+        y += HISTOGRAM_HEIGHT + MARGIN
+
+        for stage in stages:
+            mean = profiler.mean(stage)
+            share = mean / frame if frame else 0.0
+            bar = min(round(STAGE_BAR_WIDTH * share), STAGE_BAR_WIDTH)
+            pg.draw.rect(result, 'steelblue', (MARGIN, y + 2, bar, line_height - 4))
+            text = f'{stage} {1000 * mean:.2f} ms ({share:.0%})'
+
+            result.blit(
+                self.font.render(text, True, 'white'),
+                (MARGIN * 2 + STAGE_BAR_WIDTH, y)
+            )
+
+            y += line_height
+
+        if background:
+            text = self.font.render(background, True, 'gray')
+            result.blit(text, (MARGIN, y))
+
+        return result
@@ -0,0 +1,114 @@
+"""
+Overlaps the evaluation of body positions with drawing, for scenes with large
+populations of bodies.
+
+In the individual scripts, each iteration of the main loop evaluates get_pos
+and then draws the result, so any time spent evaluating is time the display
+isn't being updated. Here the positions for upcoming frames are evaluated by a
+pool of worker threads, each of which fills one slice of a position buffer,
+while the main thread draws the positions for the current frame from another
+buffer. This works because the models in models.py spend nearly all their time
+inside NumPy, which releases the GIL.
+
+There are `depth` buffers in a ring: one (the front buffer) is being drawn, and
+up to depth - 1 (the back buffers) are being filled. With depth = 2 this is
+ordinary double buffering: evaluation of frame n + 1 overlaps with drawing
+frame n. With depth = 3, evaluation of a frame can take up to two frame
+periods without holding up the display, at the cost of another frame of
+latency.
+
+Since the positions are evaluated ahead of time, the time passed to submit()
+should be the time the frame is expected to be displayed, rather than the
+current time.
+"""
+
+import collections
+import concurrent.futures as cf
+import os
+import time
+import numpy as np
+from timings import StageTimings
+
+class Pipeline:
+    def __init__(
+        self,
+        model,
+        bodies: np.ndarray,
+        depth: int = 2,
+        workers: int | None = None,
+        chunk_size: int = 1 << 16,
+        timings: StageTimings | None = None
+    ):
+        if depth < 2:
+            raise ValueError('need at least two buffers')
+
+        self.model = model
+        self.bodies = bodies
+        self.depth = depth
+        self.chunk_size = chunk_size
+        self.pool = cf.ThreadPoolExecutor(workers or os.cpu_count())
+        self.timings = timings or StageTimings()
+
+        self.buffers = [
+            np.empty((len(bodies), 2), dtype=bodies.dtype[0])
+            for _ in range(depth)
+        ]
+
+        self.free = collections.deque(range(depth))
+        self.pending = collections.deque()
+        self.front = None
+
+    def _evaluate(self, buffer: np.ndarray, start: int, stop: int, t: float) -> float:
+        begin = time.perf_counter()
+        self.model.pos(self.bodies[start:stop], t, out=buffer[start:stop])
+        return time.perf_counter() - begin
+
+    def submit(self, t: float) -> None:
+        """Start evaluating the positions at time t into a free back buffer."""
+
+        if not self.free:
+            raise RuntimeError('all back buffers are in use; call swap() first')
+
+        i = self.free.popleft()
+        buffer = self.buffers[i]
+
+        futures = [
+            self.pool.submit(
+                self._evaluate, buffer, start, start + self.chunk_size, t
+            )
+            for start in range(0, len(self.bodies), self.chunk_size)
+        ]
+
+        self.pending.append((i, t, time.perf_counter(), futures))
+
+    def swap(self) -> tuple[float, np.ndarray]:
+        """
+        Wait for the oldest submitted frame to finish evaluating and make its
+        buffer the front buffer, returning its time and positions. The
+        previous front buffer becomes free for submit() to reuse, so the
+        positions returned by the last call to swap() mustn't be used after
+        this.
+        """
+
+        if not self.pending:
+            raise RuntimeError('no frames have been submitted')
+
+        i, t, submitted, futures = self.pending.popleft()
+
+        with self.timings.measure('wait'):
+            evaluate = sum(f.result() for f in futures)
+
+        # the total time spent evaluating across all the workers, and the time
+        # since the frame was submitted, neither of which is time the main
+        # thread spent in this frame
+        self.timings.record_background('evaluate', evaluate)
+        self.timings.record_background('latency', time.perf_counter() - submitted)
+
+        if self.front is not None:
+            self.free.append(self.front)
+
+        self.front = i
+        return t, self.buffers[i]
+
+    def close(self) -> None:
+        self.pool.shutdown(cancel_futures=True)
@@ -0,0 +1,204 @@
+"""
+Static plots of trajectories, written to PNG or SVG files without opening a
+window.
+
+Sampling a trajectory uniformly means using a very high density of samples
+everywhere just so that the few places where the velocity changes suddenly,
+like the cusps where a ball bounces, come out right. Instead, polyline() puts
+vertices exactly at the times of those events, as given by the model's
+events() method, and in between, where the trajectory is smooth, it
+repeatedly splits each segment in half until the trajectory is within a given
+distance of it. A segment is checked by evaluating the trajectory at its
+quarter points and midpoint, and is accepted if they're all within the
+tolerance of the straight line between its ends. All the segments at one level
+of splitting are checked with a single vectorised evaluation.
+
+The bounces of a ball get lower and lower, so once they're no higher than the
+tolerance the rest of them are left out and the polyline just runs along the
+ground to where the ball comes to rest.
+
+The tolerance is in pixels of the final image. Since the scale of the image
+depends on the extent of the trajectory, plot() makes a first, coarse pass to
+find the extent before making the real one.
+
+Running this file plots the trajectory from bouncing_ball.py against time (as
+in desmos-graph.png) and the path from bouncing_ball_2d.py, to plot_*.png and
+plot_*.svg, and compares the number of vertices and the time taken with
+uniform sampling at one sample per millisecond, for a short run and for a long
+one with a coefficient of restitution close to 1.
+"""
+
+import time
+import numpy as np
+import pygame as pg
+import models
+
+MIN_STEP = 1e-6 # the shortest segment, in milliseconds, polyline() will split
+
+def _evaluate(model, bodies: np.ndarray, t: np.ndarray) -> np.ndarray:
+    return model.pos(np.repeat(bodies[:1], len(t)), t)
+
+def _distance(p: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """The distance of each point p from the line segment between a and b."""
+
+    ab = b - a
+    length2 = np.einsum('ij,ij->i', ab, ab)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.einsum('ij,ij->i', p - a, ab) / length2
+
+    s = np.clip(np.nan_to_num(s), 0, 1)
+    return np.hypot(*(a + s[:, None] * ab - p).T)
+
+def path(t: np.ndarray, pos: np.ndarray) -> np.ndarray:
+    return pos
+
+def against_time(axis: int):
+    """A projection plotting one coordinate of the position against time."""
+
+    def project(t: np.ndarray, pos: np.ndarray) -> np.ndarray:
+        return np.column_stack((t, pos[:, axis]))
+
+    return project
+
+def polyline(
+    model,
+    bodies: np.ndarray,
+    horizon: float,
+    tolerance: float = 0.5,
+    project=path,
+    scale: float = 1.0
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the times and projected points of the vertices of a polyline
+    within tolerance of the trajectory of bodies[0] between times 0 and
+    horizon.
+
+    project maps an array of times and the corresponding positions to points
+    in the plane the tolerance is measured in. scale is the number of those
+    units per unit of position, which is needed to tell the model which
+    bounces are too low to matter.
+    """
+
+    events = getattr(model, 'events', None)
+    times = [0.0, float(horizon)]
+
+    if events is not None:
+        times += list(events(bodies, horizon, tolerance / scale))
+
+    times = np.unique(np.array(times))
+    vertices = [times]
+    a = times[:-1]
+    b = times[1:]
+
+    while len(a):
+        mid = (a + b) / 2
+        samples = np.concatenate((a, b, (3 * a + b) / 4, mid, (a + 3 * b) / 4))
+        points = project(samples, _evaluate(model, bodies, samples))
+        pa, pb, *inner = np.split(points, 5)
+
+        deviation = np.max(
+            [_distance(p, pa, pb) for p in inner], axis=0, initial=0
+        )
+
+        split = (deviation > tolerance) & (b - a > MIN_STEP)
+        a, mid, b = a[split], mid[split], b[split]
+        vertices.append(mid)
+        a, b = np.concatenate((a, mid)), np.concatenate((mid, b))
+
+    times = np.sort(np.concatenate(vertices))
+    return times, project(times, _evaluate(model, bodies, times))
+
+def plot(
+    model,
+    bodies: np.ndarray,
+    horizon: float,
+    axis: int | None = None,
+    size: tuple[int, int] = (800, 600),
+    tolerance: float = 0.5,
+    margin: int = 20
+) -> np.ndarray:
+    """
+    Returns the vertices, in image pixels, of a polyline for the trajectory of
+    bodies[0] between times 0 and horizon, scaled to fit an image of the given
+    size. If axis is None the path of the body is plotted, with the same scale
+    and orientation as the screen; otherwise the given coordinate (0 for x, 1
+    for y) is plotted against time.
+    """
+
+    project = path if axis is None else against_time(axis)
+    _, coarse = polyline(model, bodies, horizon, project=project)
+    low = coarse.min(axis=0)
+    extent = np.maximum(coarse.max(axis=0) - low, 1e-9)
+    scale = (np.array(size) - 2 * margin) / extent
+
+    if axis is None:
+        scale[:] = scale.min()
+
+    def fitted(t: np.ndarray, pos: np.ndarray) -> np.ndarray:
+        return margin + (project(t, pos) - low) * scale
+
+    return polyline(
+        model, bodies, horizon, tolerance, fitted, float(scale[1])
+    )[1]
+
+def write_png(
+    filename: str,
+    points: np.ndarray,
+    size: tuple[int, int] = (800, 600)
+) -> None:
+    surface = pg.Surface(size)
+    surface.fill('white')
+    pg.draw.aalines(surface, 'royalblue', False, points.tolist())
+    pg.image.save(surface, filename)
+
+def write_svg(
+    filename: str,
+    points: np.ndarray,
+    size: tuple[int, int] = (800, 600)
+) -> None:
+    w, h = size
+    coordinates = ' '.join(f'{x:.2f},{y:.2f}' for x, y in points)
+
+    with open(filename, 'w') as f:
+        f.write(
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}" '
+            f'viewBox="0 0 {w} {h}">\n'
+            f'<rect width="{w}" height="{h}" fill="white"/>\n'
+            f'<polyline fill="none" stroke="royalblue" stroke-width="1.5" '
+            f'points="{coordinates}"/>\n'
+            '</svg>\n'
+        )
+
+if __name__ == '__main__':
+    SIZE = (800, 600)
+
+    def compare(name: str, model, bodies: np.ndarray, horizon: float, axis) -> None:
+        start = time.perf_counter()
+        points = plot(model, bodies, horizon, axis, SIZE)
+        write_png(f'plot_{name}.png', points, SIZE)
+        write_svg(f'plot_{name}.svg', points, SIZE)
+        adaptive = time.perf_counter() - start
+
+        start = time.perf_counter()
+        t = np.arange(0, horizon, 1.0)
+        uniform = _evaluate(model, bodies, t)
+        surface = pg.Surface(SIZE)
+        pg.draw.aalines(surface, 'royalblue', False, uniform.tolist())
+        uniform_time = time.perf_counter() - start
+
+        print(
+            f'{name}: {len(points)} vertices in {1000 * adaptive:.1f} ms, '
+            f'against {len(t)} in {1000 * uniform_time:.1f} ms'
+        )
+
+    ball = models.population(models.BouncingBall, 1)
+    ball[0] = (400, 100, 0.5, 0.01, 0.8, 600) # as in bouncing_ball.py
+    compare('bouncing_ball', models.BouncingBall, ball, 6000, 1)
+
+    ball_2d = models.population(models.BouncingBall2D, 1)
+    ball_2d[0] = (0, 100, 0.1, 0.2, 0.001, 0.8, 600) # as in bouncing_ball_2d.py
+    compare('bouncing_ball_2d', models.BouncingBall2D, ball_2d, 20_000, None)
+
+    ball[0]['k'] = 0.999
+    compare('bouncing_ball_long', models.BouncingBall, ball, 3_600_000, 1)
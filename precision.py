@@ -0,0 +1,230 @@
+"""
+The error introduced by storing a population of bodies (see models.py) in
+float32 rather than float64, and a way of choosing between the two.
+
+float32 has a 24-bit significand, so both the parameters and every intermediate
+result are rounded to a relative precision of about 6e-8. Positions stay
+accurate to well under a pixel while their magnitude is small, but for models
+whose positions keep growing, such as constant velocity or acceleration, the
+absolute error grows with them. Since time is measured in milliseconds it
+also becomes coarse over long horizons: after an hour, consecutive float32
+times are a quarter of a millisecond apart.
+
+For the bouncing balls the bounce index n is found by taking a logarithm and
+rounding down, so near the start of a bounce float32 can put the ball in the
+neighbouring bounce. This doesn't cause a jump in position, as the ball is on
+the ground at either end of a bounce, but it does mean that the bounce index
+itself can differ by one. Once bouncing has stopped the ball is just at rest
+on the ground, so the error there is only that of the rest position.
+
+Running this file measures the errors for populations like those in the
+individual scripts (screen-sized positions, speeds up to around a pixel per
+millisecond) over three horizons. The figures it gave are below: the maximum
+position error in pixels, and for the bouncing balls the proportion of samples
+whose bounce index differed. Where it differed, it was always by one.
+
+  model                        1 min     10 min    1 hour
+  ConstantVelocity             0.007     0.096     0.45
+  ConstantAcceleration         3.9       4.1e+02   1.4e+04
+  ConstantFriction             0.0074    0.05      0.35
+  ConstantFrictionWithGravity  4.2       4.6e+02   1.6e+04
+  LaminarDrag                  0.0085    0.065     0.29
+  TurbulentDrag                0.011     0.079     0.26
+  BouncingBall                 0.0029    0.0023    0.0032
+    bounce index               3e-06     0         0
+  BouncingBall2D               0.024     0.1       0.12
+    bounce index               2e-06     0         0
+
+So float32 is fine for the bouncing balls whatever the horizon, since they
+come to rest, and for the models with friction or drag over the first few
+minutes (the bodies with the least friction or drag still travel a long way in
+an hour). It isn't good enough for anything under constant acceleration,
+including gravity with friction, beyond about 15 seconds. compact() makes the
+decision for a particular population and horizon by measuring the error on a
+sample of it.
+
+LIMITS gives upper bounds, with some headroom, on the figures above, and
+check() fails if the errors go over them, if a bounce index is ever out by
+more than one, or if compact() stops choosing float64 for constant
+acceleration past 30 seconds or float32 for the bouncing balls over an hour.
+Running this file runs check() after printing the table.
+"""
+
+import numpy as np
+import models
+
+HORIZONS = [60_000, 600_000, 3_600_000]
+
+# the largest position error, in pixels, allowed at each of HORIZONS for the
+# populations given by example()
+LIMITS = {
+    models.ConstantVelocity: [0.02, 0.2, 1.0],
+    models.ConstantAcceleration: [8, 1e3, 3e4],
+    models.ConstantFriction: [0.02, 0.1, 0.7],
+    models.ConstantFrictionWithGravity: [8, 1e3, 3e4],
+    models.LaminarDrag: [0.02, 0.15, 0.6],
+    models.TurbulentDrag: [0.02, 0.15, 0.5],
+    models.BouncingBall: [0.01, 0.01, 0.01],
+    models.BouncingBall2D: [0.05, 0.2, 0.25]
+}
+
+def _times(horizon: float, samples: int, rng: np.random.Generator) -> np.ndarray:
+    # jittered so that the samples don't line up with the bounces of
+    # similar bodies
+    grid = np.linspace(0, horizon, samples)
+    return np.clip(grid + rng.uniform(0, horizon / samples, samples), 0, horizon)
+
+def error(
+    model,
+    bodies: np.ndarray,
+    horizon: float,
+    samples: int = 64,
+    seed: int = 0
+) -> dict[str, float]:
+    """
+    Compares the positions evaluated from float32 and float64 copies of bodies
+    at `samples` times spread over [0, horizon].
+
+    Returns a dict with the maximum difference in position ('position'), and
+    for models with a bounce index, the proportion of samples where it
+    differed ('bounce_index') and the largest difference ('bounce_index_max').
+    """
+
+    rng = np.random.default_rng(seed)
+    exact = bodies.astype(models.body_dtype(model, np.float64))
+    compact = bodies.astype(models.body_dtype(model, np.float32))
+    has_bounces = hasattr(model, 'bounce_index')
+    position = 0.0
+    mismatches = 0
+    bounce_index_max = 0.0
+
+    for t in _times(horizon, samples, rng):
+        diff = np.abs(model.pos(exact, t) - model.pos(compact, np.float32(t)))
+        position = max(position, float(np.nanmax(diff, initial=0)))
+
+        if has_bounces:
+            n64 = model.bounce_index(exact, t)
+            n32 = model.bounce_index(compact, np.float32(t))
+            mismatches += np.count_nonzero(n64 != n32)
+            finite = np.isfinite(n64) & np.isfinite(n32)
+            d = np.abs(n64[finite] - n32[finite])
+            bounce_index_max = max(bounce_index_max, float(d.max(initial=0)))
+
+    result = {'position': position}
+
+    if has_bounces:
+        result['bounce_index'] = mismatches / (samples * len(bodies))
+        result['bounce_index_max'] = bounce_index_max
+
+    return result
+
+def compact(
+    model,
+    bodies: np.ndarray,
+    horizon: float,
+    tolerance: float = 0.5,
+    sample_size: int = 1 << 16,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Returns bodies stored in float32 if that keeps their positions within
+    tolerance pixels of the float64 positions up to time horizon, and in
+    float64 otherwise.
+
+    The error is measured on a random sample of at most sample_size bodies,
+    and has to be within half the tolerance to allow for bodies outside the
+    sample doing worse.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    if len(bodies) > sample_size:
+        sample = bodies[rng.choice(len(bodies), sample_size, replace=False)]
+    else:
+        sample = bodies
+
+    if error(model, sample, horizon, seed=seed)['position'] <= tolerance / 2:
+        dtype = np.float32
+    else:
+        dtype = np.float64
+
+    return bodies.astype(models.body_dtype(model, dtype))
+
+def example(model, n: int, seed: int = 0) -> np.ndarray:
+    """
+    A population of bodies with parameters in the same ranges as the
+    individual scripts use.
+    """
+
+    rng = np.random.default_rng(seed)
+    bodies = models.population(model, n)
+
+    def uniform(low, high):
+        return rng.uniform(low, high, n)
+
+    for name in model.FIELDS:
+        if name in ('s0x', 'x'):
+            bodies[name] = uniform(0, 800)
+        elif name in ('s0y', 's0'):
+            bodies[name] = uniform(0, 300)
+        elif name in ('ux', 'uy', 'u0x', 'u0y', 'u'):
+            bodies[name] = uniform(-1, 1)
+        elif name in ('ax', 'ay', 'g', 'gravity'):
+            bodies[name] = uniform(0, 0.01)
+        elif name in ('friction', 'drag'):
+            bodies[name] = uniform(0, 0.001)
+        elif name == 'k':
+            bodies[name] = uniform(0.5, 0.95)
+        elif name == 'floor':
+            bodies[name] = 600
+
+    return bodies
+
+def check(n: int = 10_000) -> None:
+    """
+    Raises AssertionError if the float32 errors for populations of n bodies
+    from example() break the limits described above.
+    """
+
+    for model, limits in LIMITS.items():
+        bodies = example(model, n)
+
+        for horizon, limit in zip(HORIZONS, limits):
+            result = error(model, bodies, horizon)
+
+            assert result['position'] <= limit, (
+                f'{model.__name__}: position error {result["position"]:.2g} '
+                f'over {horizon} ms is above the limit of {limit}'
+            )
+
+            assert result.get('bounce_index_max', 0) <= 1, (
+                f'{model.__name__}: bounce index out by '
+                f'{result["bounce_index_max"]:g} over {horizon} ms'
+            )
+
+    for model in (models.ConstantAcceleration, models.ConstantFrictionWithGravity):
+        for horizon in (30_000, 60_000):
+            dtype = models.precision(compact(model, example(model, n), horizon))
+
+            assert dtype == np.float64, (
+                f'{model.__name__} kept in {dtype} over {horizon} ms'
+            )
+
+    for model in (models.BouncingBall, models.BouncingBall2D):
+        dtype = models.precision(compact(model, example(model, n), 3_600_000))
+        assert dtype == np.float32, f'{model.__name__} promoted to {dtype}'
+
+if __name__ == '__main__':
+    for model in LIMITS:
+        bodies = example(model, 10_000)
+        results = [error(model, bodies, horizon) for horizon in HORIZONS]
+        print(f'{model.__name__:29}', *(f'{r["position"]:<9.2g}' for r in results))
+
+        if 'bounce_index' in results[0]:
+            print(f'{"  bounce index":29}', *(
+                f'{r["bounce_index"]:<9.1g}'
+                for r in results
+            ))
+
+    check()
+    print('all within limits')
@@ -0,0 +1,253 @@
+"""
+A population of bodies (see models.py), and the positions of its current
+frame, kept in a named block of shared memory so that several processes can
+use the same population without each having their own copy of it or having
+it pickled and sent to them.
+
+One process creates the block with SharedPopulation.create(), which copies the
+parameters into it, and is then the only one that writes frames, with
+publish(). Any number of other processes attach to it by name with
+SharedPopulation.attach(), and get the parameters and positions as NumPy
+arrays backed directly by the shared memory, so attaching more processes
+doesn't use any more memory.
+
+The block starts with a small header giving the model, the precision and size
+of the population, and two counters, followed by the parameters and then two
+slots for positions. Frame v is written into slot v % 2, so the writer can
+write a new frame while readers are still using the previous one. The
+counters work like a seqlock: `writing` is the number of the frame being
+written, and `version` the number of the last one that's complete. A reader
+using frame v (from slot v % 2) has had it overwritten if the writer has
+started on frame v + 2, which uses the same slot; latest() gives a reader the
+current frame without copying it, and valid() says afterwards whether it was
+overwritten while being used. copy() does the same but copies the frame and
+retries until it gets a consistent one.
+
+CPython doesn't provide memory barriers, so the ordering of the writes to the
+counters and the positions relies on the processor not reordering stores,
+which holds on x86 and is generally true in practice of the NumPy copies
+involved, as there's a system call or two between them.
+"""
+
+import multiprocessing as mp
+import multiprocessing.resource_tracker as resource_tracker
+import multiprocessing.shared_memory as shm
+import sys
+import time
+import numpy as np
+import models
+import precision
+
+HEADER = np.dtype([
+    ('model', 'S32'),
+    ('precision', 'S8'),
+    ('n', '<i8'),
+    ('writing', '<u8'),
+    ('version', '<u8'),
+    ('t', '<f8', 2)
+])
+
+ALIGNMENT = 64
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+class SharedPopulation:
+    def __init__(self, block: shm.SharedMemory, owner: bool):
+        self.block = block
+        self.owner = owner
+        self.header = np.ndarray(1, HEADER, block.buf)[0]
+        self.model = getattr(models, self.header['model'].decode())
+        dtype = np.dtype(self.header['precision'].decode())
+        n = int(self.header['n'])
+        body_dtype = models.body_dtype(self.model, dtype)
+        offset = _aligned(HEADER.itemsize)
+
+        self.bodies = np.ndarray(n, body_dtype, block.buf, offset)
+        offset += _aligned(n * body_dtype.itemsize)
+
+        self.slots = np.ndarray((2, n, 2), dtype, block.buf, offset)
+
+        if not owner:
+            # readers shouldn't change the parameters under the writer
+            self.bodies.flags.writeable = False
+
+    @classmethod
+    def size(cls, model, bodies: np.ndarray) -> int:
+        """
+        The size in bytes of the block needed for a population, which is
+        stored with the model's dtype at the precision of its first field.
+        """
+
+        dtype = models.precision(bodies)
+
+        return (
+            _aligned(HEADER.itemsize)
+            + _aligned(len(bodies) * models.body_dtype(model, dtype).itemsize)
+            + 2 * len(bodies) * 2 * dtype.itemsize
+        )
+
+    @classmethod
+    def create(cls, name: str, model, bodies: np.ndarray) -> 'SharedPopulation':
+        # the layout in __init__ assumes the model's packed dtype
+        bodies = bodies.astype(models.body_dtype(model, models.precision(bodies)))
+        block = shm.SharedMemory(name, create=True, size=cls.size(model, bodies))
+        header = np.ndarray(1, HEADER, block.buf)
+        dtype = models.precision(bodies).str
+        header[0] = (model.__name__, dtype, len(bodies), 0, 0, 0)
+        del header
+        population = cls(block, owner=True)
+        population.bodies[...] = bodies
+        population.publish(0)
+        return population
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedPopulation':
+        if sys.version_info >= (3, 13):
+            block = shm.SharedMemory(name, track=False)
+        else:
+            block = shm.SharedMemory(name)
+
+            # Before 3.13 the resource tracker also tracks blocks a process
+            # only attaches to, and unlinks them when that process exits,
+            # taking them away from every other process.
+            resource_tracker.unregister(block._name, 'shared_memory')
+
+        return cls(block, owner=False)
+
+    def publish(self, t: float, positions: np.ndarray | None = None) -> int:
+        """
+        Writes the positions at time t as the next frame and returns its
+        version. If positions isn't given they're evaluated from the model
+        straight into shared memory.
+        """
+
+        if not self.owner:
+            raise RuntimeError('only the creator of a population can publish')
+
+        v = int(self.header['version']) + 1
+        self.header['writing'] = v
+        slot = self.slots[v % 2]
+
+        if positions is None:
+            self.model.pos(self.bodies, t, out=slot)
+        else:
+            slot[...] = positions
+
+        self.header['t'][v % 2] = t
+        self.header['version'] = v
+        return v
+
+    def latest(self) -> tuple[int, float, np.ndarray]:
+        """
+        Returns the version, time and positions of the latest complete frame.
+        The positions are a view of the shared memory, so valid() should be
+        used to check whether they've been overwritten.
+        """
+
+        v = int(self.header['version'])
+        return v, float(self.header['t'][v % 2]), self.slots[v % 2]
+
+    def valid(self, version: int) -> bool:
+        return int(self.header['writing']) < version + 2
+
+    def copy(self, out: np.ndarray | None = None) -> tuple[int, float, np.ndarray]:
+        """
+        Copies the latest complete frame into out, retrying if it's
+        overwritten while being copied, and returns its version, time and
+        positions.
+        """
+
+        if out is None:
+            out = np.empty_like(self.slots[0])
+
+        while True:
+            v, t, positions = self.latest()
+            out[...] = positions
+
+            if self.valid(v):
+                return v, t, out
+
+    def detach(self) -> None:
+        # the arrays have to go before the buffer they're views of can be
+        # released
+        del self.header, self.bodies, self.slots
+        self.block.close()
+
+    def unlink(self) -> None:
+        """Destroys the block, once every process has detached from it."""
+
+        if sys.version_info < (3, 13):
+            # Processes started by multiprocessing share their parent's
+            # resource tracker, so if one of them attached, the unregistering
+            # in attach() will have undone the registration made by create(),
+            # which unlink() expects to find.
+            resource_tracker.register(self.block._name, 'shared_memory')
+
+        self.block.unlink()
+
+def _reader(name: str, duration: float, results) -> None:
+    population = SharedPopulation.attach(name)
+    model = population.model
+    frames = torn = 0
+    last = -1
+    end = time.perf_counter() + duration
+
+    while time.perf_counter() < end:
+        v, t, positions = population.latest()
+
+        if v == last:
+            time.sleep(0.001)
+            continue
+
+        # check a few of the positions against the model, as an analysis
+        # process would use them, and only then whether they were overwritten
+        expected = model.pos(population.bodies[:64], t)
+        consistent = np.allclose(expected, positions[:64])
+
+        if not population.valid(v):
+            torn += 1
+        elif not consistent:
+            raise AssertionError(f'frame {v} is inconsistent')
+
+        frames += 1
+        last = v
+
+    results.put((frames, torn))
+    del positions
+    population.detach()
+
+if __name__ == '__main__':
+    N = 1_000_000
+    READERS = 4
+    DURATION = 3.0
+    NAME = 'exact_physics_population'
+
+    bodies = precision.example(models.BouncingBall2D, N)
+    population = SharedPopulation.create(NAME, models.BouncingBall2D, bodies)
+    print(f'block of {population.block.size / 2 ** 20:.1f} MiB for {N} bodies')
+
+    results = mp.Queue()
+
+    readers = [
+        mp.Process(target=_reader, args=(NAME, DURATION, results))
+        for _ in range(READERS)
+    ]
+
+    for reader in readers:
+        reader.start()
+
+    start = time.perf_counter()
+    published = 0
+
+    while any(reader.is_alive() for reader in readers):
+        population.publish(1000 * (time.perf_counter() - start))
+        published += 1
+
+    for i in range(READERS):
+        frames, torn = results.get()
+        print(f'reader {i}: {frames} frames read, {torn} overwritten in use')
+
+    print(f'{published} frames published')
+    population.detach()
+    population.unlink()
@@ -0,0 +1,194 @@
+"""
+Timing of the stages of each frame of a render loop, such as handling events,
+evaluating positions, drawing and flipping the display.
+
+Stages are time the main thread spends within a frame, so they add up to at
+most the frame time and can be shown as a share of it. Durations that aren't,
+such as the time worker threads spend evaluating positions (summed over all of
+them) or the latency from submitting a frame to displaying it, are recorded
+with record_background() instead and kept apart from the stages.
+"""
+
+import collections
+import contextlib
+import csv
+import time
+
+class _Measurement:
+    # a plain class rather than contextlib.contextmanager, which costs a few
+    # microseconds per use
+    __slots__ = ('timings', 'stage', 'start')
+
+    def __init__(self, timings: 'StageTimings', stage: str):
+        self.timings = timings
+        self.stage = stage
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.timings.record(self.stage, time.perf_counter() - self.start)
+
+class StageTimings:
+    """
+    Keeps the most recent `window` durations, in seconds, of each named stage
+    of a frame, and of each named background figure.
+    """
+
+    def __init__(self, window: int = 120):
+        self.window = window
+        self.samples: dict[str, collections.deque[float]] = {}
+        self.background: dict[str, collections.deque[float]] = {}
+
+    def _append(self, samples: dict, name: str, seconds: float) -> None:
+        if name not in samples:
+            samples[name] = collections.deque(maxlen=self.window)
+
+        samples[name].append(seconds)
+
+    def record(self, stage: str, seconds: float) -> None:
+        self._append(self.samples, stage, seconds)
+
+    def record_background(self, name: str, seconds: float) -> None:
+        self._append(self.background, name, seconds)
+
+    def measure(self, stage: str) -> _Measurement:
+        return _Measurement(self, stage)
+
+    def mean(self, stage: str) -> float:
+        samples = self.samples.get(stage, self.background.get(stage))
+        return sum(samples) / len(samples) if samples else 0.0
+
+    def summary(self) -> str:
+        summary = ' '.join(
+            f'{stage}={1000 * self.mean(stage):.1f}ms' for stage in self.samples
+        )
+
+        if self.background:
+            summary += ' | background ' + ' '.join(
+                f'{name}={1000 * self.mean(name):.1f}ms' for name in self.background
+            )
+
+        return summary
+
+_UNTIMED = contextlib.nullcontext()
+
+class Profiler(StageTimings):
+    """
+    StageTimings for a render loop, which also keeps the duration of each of
+    the last `window` frames and counts of things done per frame (such as the
+    number of bodies drawn). end_frame() must be called once at the end of
+    each frame.
+
+    To keep the cost of instrumentation down, stages are only timed on every
+    sample_every-th frame; on the others, measure() returns a shared context
+    manager that does nothing, and record() and count() return straight away.
+    The frame time is measured on every frame, which costs one call to
+    perf_counter().
+    """
+
+    def __init__(self, window: int = 600, sample_every: int = 8):
+        super().__init__(max(window // sample_every, 1))
+        self.sample_every = sample_every
+        self.frames = collections.deque(maxlen=window)
+        self.counts: dict[str, int] = {}
+        self.frame = 0
+        self.sampling = True
+        self.current: dict[str, float] = {}
+        self.current_background: dict[str, float] = {}
+        self.last = time.perf_counter()
+
+    def record(self, stage: str, seconds: float) -> None:
+        if self.sampling:
+            super().record(stage, seconds)
+            self.current[stage] = self.current.get(stage, 0.0) + seconds
+
+    def record_background(self, name: str, seconds: float) -> None:
+        if self.sampling:
+            super().record_background(name, seconds)
+
+            self.current_background[name] = (
+                self.current_background.get(name, 0.0) + seconds
+            )
+
+    def measure(self, stage: str):
+        if self.sampling:
+            return super().measure(stage)
+
+        return _UNTIMED
+
+    def count(self, name: str, value: int) -> None:
+        if self.sampling:
+            self.counts[name] = value
+
+    def end_frame(self) -> None:
+        now = time.perf_counter()
+
+        if self.sampling:
+            self.frames.append((
+                self.frame, now - self.last, self.current,
+                self.current_background, dict(self.counts)
+            ))
+
+            self.current = {}
+            self.current_background = {}
+        else:
+            self.frames.append((self.frame, now - self.last, None, None, None))
+
+        self.last = now
+        self.frame += 1
+        self.sampling = self.frame % self.sample_every == 0
+
+    def frame_times(self) -> list[float]:
+        return [seconds for _, seconds, *_ in self.frames]
+
+    def fps(self) -> float:
+        total = sum(self.frame_times())
+        return len(self.frames) / total if total else 0.0
+
+    def percentile(self, q: float) -> float:
+        times = sorted(self.frame_times())
+        return times[min(int(q * len(times)), len(times) - 1)] if times else 0.0
+
+    def dump(self, path: str) -> None:
+        """
+        Writes the rolling window of frames to a CSV file, one row per frame.
+        The stage and count columns are empty for frames that weren't sampled.
+        Background figures come after the stages, in columns whose names start
+        with background_.
+        """
+
+        stages = list(self.samples)
+        background = list(self.background)
+        counts = list(self.counts)
+
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+
+            writer.writerow([
+                'frame', 'frame_ms',
+                *(f'{stage}_ms' for stage in stages),
+                *(f'background_{name}_ms' for name in background),
+                *counts
+            ])
+
+            for frame, seconds, times, background_times, frame_counts in self.frames:
+                row = [frame, f'{1000 * seconds:.3f}']
+
+                if times is None:
+                    row += [''] * (len(stages) + len(background) + len(counts))
+                else:
+                    row += [
+                        f'{1000 * times[stage]:.3f}' if stage in times else ''
+                        for stage in stages
+                    ]
+
+                    row += [
+                        f'{1000 * background_times[name]:.3f}'
+                        if name in background_times else ''
+                        for name in background
+                    ]
+
+                    row += [frame_counts.get(name, '') for name in counts]
+
+                writer.writerow(row)